@@ -1,8 +1,11 @@
 import os
 import json
+import math
 import logging
 from flask import Flask, render_template, request, jsonify, session, redirect, url_for, flash
 from scraper import scrape_transfermarkt
+from utils import parse_market_value
+from similarity import get_feature_index, invalidate_feature_index, find_similar_players
 import pandas as pd
 from datetime import datetime
 
@@ -17,6 +20,9 @@ app.secret_key = os.environ.get("SESSION_SECRET", "default-secret-key-for-develo
 PLAYERS_FILE = 'data/players.json'
 USER_DATA_FILE = 'data/user_data.json'
 
+# Maximum number of players returned by the similarity search
+MAX_SIMILAR_PLAYERS = 100
+
 # Ensure data directory exists
 os.makedirs('data', exist_ok=True)
 
@@ -69,17 +75,20 @@ def save_user_data(data):
     with open(USER_DATA_FILE, 'w') as f:
         json.dump(data, f)
 
+def is_players_file_fresh():
+    """Check if the cached players file exists and is less than 24 hours old"""
+    if not os.path.exists(PLAYERS_FILE):
+        return False
+    file_modified_time = os.path.getmtime(PLAYERS_FILE)
+    current_time = datetime.now().timestamp()
+    return current_time - file_modified_time < 86400  # 86400 seconds = 24 hours
+
 def get_players_data():
     try:
         # Check if we have cached data and if it's recent enough (less than 1 day old)
-        if os.path.exists(PLAYERS_FILE):
-            file_modified_time = os.path.getmtime(PLAYERS_FILE)
-            current_time = datetime.now().timestamp()
-            
-            # If file is less than 24 hours old, use cached data
-            if current_time - file_modified_time < 86400:  # 86400 seconds = 24 hours
-                with open(PLAYERS_FILE, 'r', encoding='utf-8') as f:
-                    return json.load(f)
+        if is_players_file_fresh():
+            with open(PLAYERS_FILE, 'r', encoding='utf-8') as f:
+                return json.load(f)
         
         # Otherwise, scrape fresh data
         logging.info("Scraping fresh data from Transfermarkt...")
@@ -90,10 +99,7 @@ def get_players_data():
         
         # Convert market values to numeric for percentile calculation
         # Remove currency symbols and convert to float
-        df['market_value_numeric'] = df['market_value'].apply(
-            lambda x: float(x.replace('€', '').replace('m', '').replace(',', '.'))
-            if 'm' in x else float(x.replace('€', '').replace('k', '').replace(',', '.')) / 1000
-        )
+        df['market_value_numeric'] = df['market_value'].apply(parse_market_value)
         
         # Calculate percentile ranks
         df['percentile'] = df['market_value_numeric'].rank(pct=True) * 100
@@ -156,6 +162,42 @@ def get_players():
     
     return jsonify(players)
 
+def get_similarity_index():
+    """Get the feature index for the current data load, rebuilding it only when the data changes"""
+    # Loading may scrape and rewrite the players file, so the key is read afterwards
+    players = None
+    if not is_players_file_fresh():
+        players = get_players_data()
+    
+    key = os.path.getmtime(PLAYERS_FILE) if os.path.exists(PLAYERS_FILE) else None
+    return get_feature_index(key, lambda: players if players is not None else get_players_data())
+
+@app.route('/api/players/<player_id>/similar')
+def get_similar_players(player_id):
+    """Find the players most similar to the given one"""
+    try:
+        k = int(request.args.get('k', 10))
+        max_value = request.args.get('max_value')
+        max_value = float(max_value) if max_value else None
+        if k < 1 or (max_value is not None and math.isnan(max_value)):
+            raise ValueError
+    except ValueError:
+        return jsonify({"success": False, "message": "Invalid k or max_value"}), 400
+    
+    league = request.args.get('league')
+    
+    # Limit the response size regardless of the requested k
+    k = min(k, MAX_SIMILAR_PLAYERS)
+    
+    index = get_similarity_index()
+    results = find_similar_players(index, player_id, k=k, league=league, max_value=max_value)
+    
+    if results is None:
+        return jsonify({"success": False, "message": "Player not found"}), 404
+    
+    players = [dict(player, distance=round(distance, 4)) for player, distance in results]
+    return jsonify({"success": True, "player_id": player_id, "players": players})
+
 @app.route('/api/toggle_favorite', methods=['POST'])
 def toggle_favorite():
     player_id = request.json.get('player_id')
@@ -365,6 +407,9 @@ def refresh_data():
         if os.path.exists(PLAYERS_FILE):
             os.remove(PLAYERS_FILE)
         
+        # Drop the similarity index so it is rebuilt from the new data
+        invalidate_feature_index()
+        
         # Re-fetch the data
         players = get_players_data()
         return jsonify({"success": True, "count": len(players)})
@@ -0,0 +1,395 @@
+import argparse
+import csv
+import json
+import logging
+import os
+import sys
+from datetime import datetime
+from itertools import islice
+
+from app import PLAYERS_FILE, get_players_data, get_user_data, save_user_data
+
+FORMATS = ['csv', 'ndjson', 'parquet']
+
+# Campos con listas u objetos, que en CSV y Parquet se guardan como JSON
+NESTED_FIELDS = ['lists', 'comments']
+
+# Columnas que se leen al importar
+USER_FIELDS = ['id', 'favorite'] + NESTED_FIELDS
+
+# Columnas exportadas: los campos de players.json seguidos de los datos de usuario
+PLAYER_FIELDS = [
+    'id', 'name', 'position', 'nationality', 'club', 'league', 'market_value',
+    'photo_url', 'club_badge_url', 'birth_date', 'age', 'height', 'preferred_foot',
+    'joined', 'contract_expires', 'percentile'
+]
+EXPORT_FIELDS = PLAYER_FIELDS + ['favorite'] + NESTED_FIELDS
+
+# Columnas numéricas en el esquema de Parquet; el resto se guarda como texto
+INTEGER_FIELDS = ['age', 'percentile']
+
+def detect_format(path, fmt=None):
+    """
+    Returns the export format, either the one given or the one implied by the file extension.
+    """
+    if fmt:
+        return fmt
+    extension = os.path.splitext(path)[1].lower().lstrip('.')
+    if extension == 'jsonl':
+        extension = 'ndjson'
+    if extension not in FORMATS:
+        raise ValueError(f"Cannot detect format for '{path}', use --format")
+    return extension
+
+def positive_int(value):
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {value}")
+    return number
+
+def normalize_comments(comments, timestamp=None):
+    # Los comentarios antiguos eran un string; los convertimos al formato de lista
+    if comments and isinstance(comments, str):
+        return [{
+            'text': comments,
+            'timestamp': timestamp
+        }]
+    return comments or []
+
+def load_players():
+    """
+    Loads the players from the local data file, only scraping when it does not exist yet.
+
+    Unlike get_players_data, a stale file is exported as is instead of being regenerated.
+    """
+    if os.path.exists(PLAYERS_FILE):
+        with open(PLAYERS_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    return get_players_data()
+
+def iter_enriched_players(players, user_data):
+    """
+    Yields each player joined with its favorite status, lists and comments.
+
+    Player dictionaries are copied one at a time so the joined set is never
+    held in memory as a whole. Lists carry their name and description so they
+    can be recreated on import, and legacy string comments are exported with
+    a null timestamp.
+    """
+    favorites = set(user_data.get('favorites', []))
+    comments = user_data.get('comments', {})
+
+    # Map each player to the lists that contain them
+    player_lists = {}
+    for list_id, favorite_list in user_data.get('favorite_lists', {}).items():
+        list_info = {
+            'id': list_id,
+            'name': favorite_list.get('name', list_id),
+            'description': favorite_list.get('description', '')
+        }
+        for player_id in favorite_list.get('players', []):
+            player_lists.setdefault(player_id, []).append(list_info)
+
+    for player in players:
+        enriched = dict(player)
+        enriched['favorite'] = player['id'] in favorites
+        enriched['lists'] = player_lists.get(player['id'], [])
+        enriched['comments'] = normalize_comments(comments.get(player['id'], []))
+        yield enriched
+
+def iter_chunks(rows, chunk_size):
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+def encode_nested(row):
+    return {key: json.dumps(value, ensure_ascii=False) if key in NESTED_FIELDS else value
+            for key, value in row.items()}
+
+def decode_nested(row):
+    decoded = dict(row)
+    for key in NESTED_FIELDS:
+        if isinstance(decoded.get(key), str):
+            decoded[key] = json.loads(decoded[key]) if decoded[key] else []
+    return decoded
+
+def import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise RuntimeError("Parquet support requires pyarrow (pip install pyarrow)")
+    return pyarrow
+
+def parquet_schema(pa):
+    fields = []
+    for name in EXPORT_FIELDS:
+        if name in INTEGER_FIELDS:
+            fields.append((name, pa.int64()))
+        elif name == 'favorite':
+            fields.append((name, pa.bool_()))
+        else:
+            fields.append((name, pa.string()))
+    return pa.schema(fields)
+
+def export_players(path, fmt, chunk_size=1000):
+    """
+    Streams the enriched player set to a CSV, NDJSON or Parquet file in chunks.
+
+    CSV and Parquet always use the EXPORT_FIELDS columns, so an empty player set
+    still produces a file with a header or schema. The output is written to a
+    temporary file and only moved into place once the export succeeds.
+
+    Returns:
+        int: Number of players written
+    """
+    if chunk_size < 1:
+        raise ValueError(f"Chunk size must be at least 1, got {chunk_size}")
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported format: {fmt}")
+
+    players = load_players()
+    user_data = get_user_data()
+    rows = iter_enriched_players(players, user_data)
+
+    tmp_path = f"{path}.tmp"
+    try:
+        count = write_rows(tmp_path, fmt, rows, chunk_size)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    return count
+
+def write_rows(path, fmt, rows, chunk_size):
+    count = 0
+    if fmt == 'ndjson':
+        with open(path, 'w', encoding='utf-8') as f:
+            for chunk in iter_chunks(rows, chunk_size):
+                f.writelines(json.dumps(row, ensure_ascii=False) + '\n' for row in chunk)
+                count += len(chunk)
+
+    elif fmt == 'csv':
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=EXPORT_FIELDS, extrasaction='ignore')
+            writer.writeheader()
+            for chunk in iter_chunks(rows, chunk_size):
+                writer.writerows(encode_nested(row) for row in chunk)
+                count += len(chunk)
+
+    elif fmt == 'parquet':
+        pa = import_pyarrow()
+        schema = parquet_schema(pa)
+        with pa.parquet.ParquetWriter(path, schema) as writer:
+            for chunk in iter_chunks(rows, chunk_size):
+                chunk = [encode_nested(row) for row in chunk]
+                writer.write_table(pa.Table.from_pylist(chunk, schema=schema))
+                count += len(chunk)
+
+    return count
+
+def iter_rows(path, fmt, chunk_size=1000):
+    """
+    Yields the raw rows of a CSV, NDJSON or Parquet file without loading it whole.
+
+    Rows are decoded separately by parse_row so errors can name the row.
+    """
+    if fmt == 'ndjson':
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    yield line
+
+    elif fmt == 'csv':
+        with open(path, 'r', encoding='utf-8', newline='') as f:
+            yield from csv.DictReader(f)
+
+    elif fmt == 'parquet':
+        pa = import_pyarrow()
+        parquet_file = pa.parquet.ParquetFile(path)
+        columns = [name for name in USER_FIELDS
+                   if name in parquet_file.schema_arrow.names]
+        for batch in parquet_file.iter_batches(batch_size=chunk_size, columns=columns):
+            yield from batch.to_pylist()
+
+    else:
+        raise ValueError(f"Unsupported format: {fmt}")
+
+def parse_row(row, fmt):
+    """
+    Decodes a raw row from iter_rows into a dictionary with native values.
+    """
+    if fmt == 'ndjson':
+        return json.loads(row)
+    if fmt == 'csv':
+        row['favorite'] = (row.get('favorite') or '').lower() == 'true'
+    return decode_nested(row)
+
+def validate_row(row):
+    """
+    Checks that an imported row has the shape merge_user_row expects.
+
+    Returns:
+        str: Description of the problem, or None if the row is valid
+    """
+    if not isinstance(row, dict):
+        return "is not an object"
+
+    if row.get('id') in (None, ''):
+        return "has no player id"
+
+    lists = row.get('lists')
+    if lists is not None:
+        if not isinstance(lists, list) or not all(
+                isinstance(list_info, dict) and isinstance(list_info.get('id'), (str, int))
+                and list_info['id'] != '' for list_info in lists):
+            return "has invalid lists, expected a list of objects with an id"
+
+    comments = row.get('comments')
+    if comments is not None and not isinstance(comments, str):
+        if not isinstance(comments, list) or not all(isinstance(comment, dict) for comment in comments):
+            return "has invalid comments, expected a string or a list of objects"
+
+    return None
+
+def build_membership(user_data):
+    """
+    Returns sets of the current favorites and list members for constant time lookups.
+    """
+    return {
+        "favorites": set(user_data.get('favorites', [])),
+        "lists": {list_id: set(favorite_list.get('players', []))
+                  for list_id, favorite_list in user_data.get('favorite_lists', {}).items()}
+    }
+
+def merge_comments(user_data, player_id, comments):
+    """
+    Adds the comments that the player does not have yet.
+
+    Comments without a timestamp come from legacy strings, so they are matched
+    on their text and stamped with the import time only when they are new.
+    """
+    comments = normalize_comments(comments)
+    if not comments:
+        return
+
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    all_comments = user_data.setdefault('comments', {})
+    player_comments = normalize_comments(all_comments.get(player_id), timestamp)
+    texts = {comment.get('text') for comment in player_comments}
+
+    for comment in comments:
+        if comment.get('timestamp') is None:
+            if comment.get('text') in texts:
+                continue
+            comment = dict(comment, timestamp=timestamp)
+        elif comment in player_comments:
+            continue
+        player_comments.append(comment)
+        texts.add(comment.get('text'))
+
+    all_comments[player_id] = player_comments
+
+def merge_user_row(user_data, membership, row):
+    """
+    Merges the favorites, lists and comments of an exported row into the user data.
+
+    Existing entries are kept, so importing the same file twice is harmless.
+    """
+    player_id = str(row['id'])
+    favorite_lists = user_data.setdefault('favorite_lists', {})
+
+    lists = list(row.get('lists') or [])
+    if row.get('favorite') and not any(list_info.get('id') == 'default' for list_info in lists):
+        lists.append({'id': 'default'})
+
+    for list_info in lists:
+        list_id = str(list_info['id'])
+        if list_id not in favorite_lists:
+            favorite_lists[list_id] = {
+                "name": list_info.get('name', list_id),
+                "description": list_info.get('description', ''),
+                "players": []
+            }
+            membership['lists'][list_id] = set()
+        if player_id not in membership['lists'][list_id]:
+            favorite_lists[list_id]['players'].append(player_id)
+            membership['lists'][list_id].add(player_id)
+
+        # For backwards compatibility, also update the main favorites list
+        if list_id == 'default' and player_id not in membership['favorites']:
+            user_data.setdefault('favorites', []).append(player_id)
+            membership['favorites'].add(player_id)
+
+    merge_comments(user_data, player_id, row.get('comments'))
+
+def import_user_data(path, fmt, chunk_size=1000):
+    """
+    Merges favorites, lists and comments from an exported file into the user data.
+
+    All rows are merged in memory and the user data file is written once at the end.
+
+    Returns:
+        int: Number of rows read
+    """
+    if chunk_size < 1:
+        raise ValueError(f"Chunk size must be at least 1, got {chunk_size}")
+
+    user_data = get_user_data()
+    membership = build_membership(user_data)
+
+    count = 0
+    for count, row in enumerate(iter_rows(path, fmt, chunk_size), start=1):
+        try:
+            row = parse_row(row, fmt)
+        except ValueError as e:
+            raise ValueError(f"Row {count} in '{path}' is not valid JSON: {str(e)}")
+
+        error = validate_row(row)
+        if error:
+            raise ValueError(f"Row {count} in '{path}' {error}")
+        merge_user_row(user_data, membership, row)
+
+    save_user_data(user_data)
+    return count
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk export and import of TransferTracker data")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    export_parser = subparsers.add_parser(
+        'export',
+        help="Export players joined with favorites, lists and comments",
+        epilog=f"Players are read from {PLAYERS_FILE} as is; data is only scraped if that file does not exist."
+    )
+    export_parser.add_argument('output', help="Output file (.csv, .ndjson or .parquet)")
+
+    import_parser = subparsers.add_parser('import', help="Import favorites, lists and comments from an exported file")
+    import_parser.add_argument('input', help="Input file (.csv, .ndjson or .parquet)")
+
+    for subparser in (export_parser, import_parser):
+        subparser.add_argument('--format', choices=FORMATS, help="File format (detected from the extension by default)")
+        subparser.add_argument('--chunk-size', type=positive_int, default=1000, help="Rows processed per chunk")
+
+    args = parser.parse_args(argv)
+    logging.getLogger().setLevel(logging.INFO)
+
+    try:
+        if args.command == 'export':
+            count = export_players(args.output, detect_format(args.output, args.format), args.chunk_size)
+            print(f"Exported {count} players to {args.output}")
+        else:
+            count = import_user_data(args.input, detect_format(args.input, args.format), args.chunk_size)
+            print(f"Imported user data from {count} rows in {args.input}")
+    except (ValueError, RuntimeError, OSError) as e:
+        print(f"Error: {str(e)}", file=sys.stderr)
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,147 @@
+import logging
+import numpy as np
+
+from utils import parse_market_value
+
+# Campos categóricos que se codifican como one-hot en la matriz de características
+CATEGORICAL_FIELDS = ['position', 'preferred_foot', 'league']
+
+# Cache of the feature index, keyed by the modification time of the players file
+_index_cache = {
+    "key": None,
+    "index": None
+}
+
+def _parse_number(value, parser):
+    try:
+        return parser(value)
+    except (TypeError, ValueError, AttributeError):
+        return np.nan
+
+def build_feature_index(players):
+    """
+    Builds the feature matrix used for similarity search.
+
+    Numeric fields (age, height, market value, percentile, contract expiry) are
+    standardized and categorical fields are one-hot encoded, so every column
+    contributes on a comparable scale.
+
+    Args:
+        players (list): Player dictionaries as returned by get_players_data
+
+    Returns:
+        dict: The feature matrix plus the per-row arrays needed for filtering
+    """
+    n = len(players)
+
+    numeric = np.empty((n, 5), dtype=np.float32)
+    market_values = np.empty(n, dtype=np.float32)
+    for row, player in enumerate(players):
+        market_value = _parse_number(player.get('market_value'), parse_market_value)
+        market_values[row] = market_value
+        numeric[row] = (
+            _parse_number(player.get('age'), float),
+            _parse_number(player.get('height'), lambda x: float(x.replace('cm', ''))),
+            # Log scale so that €1m vs €5m weighs as much as €20m vs €100m
+            np.log1p(market_value),
+            _parse_number(player.get('percentile'), float),
+            _parse_number(player.get('contract_expires'), lambda x: float(x.split('-')[0]))
+        )
+
+    # Fill missing values with the column mean, then standardize
+    means = np.nan_to_num(np.nanmean(numeric, axis=0))
+    missing = np.isnan(numeric)
+    numeric[missing] = np.take(means, np.nonzero(missing)[1])
+    stds = numeric.std(axis=0)
+    stds[stds == 0] = 1
+    numeric = (numeric - means) / stds
+
+    blocks = [numeric]
+    codes = {}
+    for field in CATEGORICAL_FIELDS:
+        values = np.array([str(player.get(field, '')) for player in players], dtype=object)
+        categories, inverse = np.unique(values, return_inverse=True)
+        one_hot = np.zeros((n, len(categories)), dtype=np.float32)
+        one_hot[np.arange(n), inverse] = 1
+        blocks.append(one_hot)
+        codes[field] = (categories, inverse)
+
+    league_categories, league_codes = codes['league']
+
+    index = {
+        "players": players,
+        "ids": {player['id']: row for row, player in enumerate(players)},
+        "matrix": np.ascontiguousarray(np.hstack(blocks), dtype=np.float32),
+        "market_values": market_values,
+        "league_categories": list(league_categories),
+        "league_codes": league_codes
+    }
+
+    logging.info(f"Built similarity index with {n} players and {index['matrix'].shape[1]} features")
+    return index
+
+def get_feature_index(key, load_players):
+    """
+    Returns the cached feature index for the given key, building it if needed.
+
+    Args:
+        key: Identifies the current data load (e.g. the players file mtime)
+        load_players (callable): Returns the player list when a rebuild is needed
+    """
+    if _index_cache["index"] is None or _index_cache["key"] != key:
+        _index_cache["index"] = build_feature_index(load_players())
+        _index_cache["key"] = key
+    return _index_cache["index"]
+
+def invalidate_feature_index():
+    """Drops the cached feature index so it is rebuilt on the next query."""
+    _index_cache["key"] = None
+    _index_cache["index"] = None
+
+def find_similar_players(index, player_id, k=10, league=None, max_value=None):
+    """
+    Finds the k players closest to the given one in feature space.
+
+    Args:
+        index (dict): Feature index built by build_feature_index
+        player_id (str): ID of the reference player
+        k (int): Number of similar players to return
+        league (str): Only consider players from this league
+        max_value (float): Only consider players worth at most this many millions
+
+    Returns:
+        list: (player, distance) tuples sorted from most to least similar,
+              or None if the player is not in the index
+    """
+    row = index["ids"].get(player_id)
+    if row is None:
+        return None
+
+    matrix = index["matrix"]
+    mask = np.ones(matrix.shape[0], dtype=bool)
+    mask[row] = False
+
+    if league:
+        if league not in index["league_categories"]:
+            return []
+        mask &= index["league_codes"] == index["league_categories"].index(league)
+
+    if max_value is not None:
+        mask &= index["market_values"] <= max_value
+
+    candidates = np.flatnonzero(mask)
+    if k <= 0 or len(candidates) == 0:
+        return []
+
+    # Squared euclidean distance to every candidate in a single pass
+    diff = matrix[candidates] - matrix[row]
+    distances = np.einsum('ij,ij->i', diff, diff)
+
+    if k < len(candidates):
+        top = np.argpartition(distances, k)[:k]
+    else:
+        top = np.arange(len(candidates))
+    top = top[np.argsort(distances[top])]
+
+    players = index["players"]
+    return [(players[candidates[i]], float(np.sqrt(distances[i]))) for i in top]
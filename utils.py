@@ -0,0 +1,7 @@
+def parse_market_value(value):
+    """
+    Converts a market value string like "€30m" or "€900k" to millions of euros.
+    """
+    if 'm' in value:
+        return float(value.replace('€', '').replace('m', '').replace(',', '.'))
+    return float(value.replace('€', '').replace('k', '').replace(',', '.')) / 1000